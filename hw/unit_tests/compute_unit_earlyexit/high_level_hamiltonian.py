@@ -4,16 +4,45 @@ Ising model: H = sigma^T * J * sigma
 where sigma is a binary vector (0 or 1) mapped to spins (-1 or +1)
 """
 
+import importlib.util
+import os
+import threading
+from importlib.machinery import ExtensionFileLoader
+
 import numpy as np
 
+try:
+    from numba import njit, prange
+except ImportError:
+    # numba is optional: fall back to plain Python loops with identical results
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# numba's on-disk cache is keyed on this file, but parallel kernels store the name
+# the module was imported under; caching only under the plain name (or as a script)
+# keeps a package / runpy import from loading entries it cannot resolve
+_NUMBA_CACHE = __name__ in ("__main__", os.path.splitext(os.path.basename(__file__))[0])
+
+try:
+    from scipy.linalg.blas import dsymv as _dsymv
+except ImportError:
+    # scipy is optional: without it float J uses the plain GEMV path
+    _dsymv = None
 
-def calculate_hamiltonian(sigma, J):
+
+def calculate_hamiltonian(sigma, J, J_sym=None):
     """
     Calculate Hamiltonian energy: H = sigma^T * J * sigma
     
     Args:
         sigma: Binary vector (numpy array) where 0 maps to spin -1, 1 maps to spin +1
         J: Coupling matrix (numpy array, square matrix)
+        J_sym: Optional symmetrize_j(J) for a float64 J; when given (and scipy is
+               available) the energy is computed with SYMV on it
     
     Returns:
         Scalar energy value
@@ -23,16 +52,105 @@ def calculate_hamiltonian(sigma, J):
         >>> J = np.ones((4, 4)) * 3
         >>> energy = calculate_hamiltonian(sigma, J)
     """
-    # Convert binary (0/1) to spins (-1/+1)
-    spins = 2 * sigma - 1
+    # Convert binary (0/1) to spins (-1/+1), kept as int8 when J is integer
+    spins = _to_spins(sigma, _spin_dtype(J))
     
     # Calculate H = spins^T * J * spins
-    energy = spins.T @ J @ spins
-    
-    return int(energy)
+    return _spin_quadform(spins, J, J_sym)
+
+
+# Per-thread scratch buffers (spin vector, J @ spins), keyed by (name, size, dtype)
+_scratch_buffers = threading.local()
+
+
+def _scratch(name, size, dtype):
+    """
+    Reusable per-thread work array, overwritten by the next call with the same key
+    """
+    buffers = getattr(_scratch_buffers, "by_key", None)
+    if buffers is None:
+        buffers = _scratch_buffers.by_key = {}
+    
+    key = (name, size, np.dtype(dtype))
+    buf = buffers.get(key)
+    if buf is None:
+        buf = buffers[key] = np.empty(size, dtype=dtype)
+    return buf
+
+
+def _is_integer_j(J):
+    """
+    True when J has an integer dtype, so energies are computed exactly in int64
+    """
+    return np.issubdtype(J.dtype, np.integer)
+
+
+def _spin_dtype(J):
+    """
+    Spin dtype matching J: int8 for integer couplings, float64 otherwise
+    """
+    return np.int8 if _is_integer_j(J) else np.float64
+
 
+# Spin value for each sigma bit: 0 -> -1, 1 -> +1
+_SPIN_LUT = np.array([-1, 1], dtype=np.int8)
 
-def calculate_energy_difference(sigma_old, sigma_new, J):
+
+def _spin_lut(sigma):
+    """
+    Map binary sigma (0/1) to int8 spins (-1/+1) with one table gather, no arithmetic temps
+    """
+    return _SPIN_LUT[np.asarray(sigma, dtype=bool).view(np.uint8)]
+
+
+def _to_spins(sigma, dtype=np.float64):
+    """
+    Map binary sigma (0/1) to spins (-1/+1) without allocating a new array
+    The result lives in a per-thread buffer and is overwritten by the next call
+    """
+    spins = _scratch("spins", sigma.shape[0], dtype)
+    np.multiply(sigma, 2, out=spins, casting="unsafe")
+    spins -= 1
+    return spins
+
+
+def _spin_quadform(spins, J, J_sym=None):
+    """
+    Quadratic form spins^T * J * spins as an int, computed as one matrix-vector
+    product into a scratch buffer followed by a dot product
+    Integer J stays on the integer path with int64 accumulation,
+    a caller-supplied J_sym goes through SYMV when scipy is available
+    """
+    if _is_integer_j(J):
+        Jv = _int_spin_matvec(J, spins, _scratch("Jv", J.shape[0], np.int64))
+    elif J_sym is not None and _dsymv is not None and spins.dtype == np.float64:
+        Jv = _scratch("Jv", J.shape[0], np.float64)
+        Jv = _dsymv(1.0, J_sym, spins, y=Jv, overwrite_y=True)
+    else:
+        Jv = _scratch("Jv", J.shape[0], np.float64)
+        np.matmul(J, spins, out=Jv)
+    
+    return int(np.dot(spins, Jv))
+
+
+def _int_spin_matvec(J, spins, out):
+    """
+    J @ spins for integer J and +/-1 spins, written into the int64 array out
+    Row sums are bounded by n_cols * max|J|. When that fits the signed dtype of J
+    the product runs in that dtype, so J is never copied to int64; otherwise
+    (or for unsigned J) it widens to int64
+    """
+    if J.dtype.kind == "i" and J.dtype != np.int64 and J.size:
+        bound = J.shape[1] * max(-int(J.min()), int(J.max()))
+        if bound <= np.iinfo(J.dtype).max:
+            np.copyto(out, np.matmul(J, spins.astype(J.dtype)))
+            return out
+    
+    np.matmul(J, spins, dtype=np.int64, out=out)
+    return out
+
+
+def calculate_energy_difference(sigma_old, sigma_new, J, J_sym=None):
     """
     Calculate energy difference: Delta_H = H_new - H_old
     
@@ -40,6 +158,7 @@ def calculate_energy_difference(sigma_old, sigma_new, J):
         sigma_old: Old binary vector (numpy array)
         sigma_new: New binary vector (numpy array)
         J: Coupling matrix (numpy array, square matrix)
+        J_sym: Optional symmetrize_j(J) for a float64 J, passed to calculate_hamiltonian
     
     Returns:
         Energy difference (scalar)
@@ -50,10 +169,116 @@ def calculate_energy_difference(sigma_old, sigma_new, J):
         >>> J = np.ones((256, 256)) * 3
         >>> delta = calculate_energy_difference(sigma_old, sigma_new, J)
     """
-    energy_old = calculate_hamiltonian(sigma_old, J)
-    energy_new = calculate_hamiltonian(sigma_new, J)
+    flipped = np.flatnonzero(sigma_old != sigma_new)
+    if flipped.size == 0:
+        return 0
+
+    # Float J: Delta_H is defined on the int-truncated energies, which the
+    # incremental form below cannot reproduce for non-integer couplings
+    if not _is_integer_j(J):
+        energy_new = calculate_hamiltonian(sigma_new, J, J_sym)
+        return energy_new - calculate_hamiltonian(sigma_old, J, J_sym)
+
+    # Integer J: only the flipped spins contribute. With d = spins_new - spins_old
+    # (d_i = -2 * spins_old[i] on flipped bits, 0 elsewhere)
+    # Delta_H = d^T J s + s^T J d + d^T J d, which needs k rows and k columns
+    # of J instead of two full N x N products
+    spins_old = _to_spins(sigma_old, _spin_dtype(J))
+    d = -2 * spins_old[flipped].astype(np.int64)
+
+    row_fields = _int_spin_matvec(J[flipped, :], spins_old, np.empty(flipped.size, np.int64))
+    col_fields = _int_spin_matvec(J[:, flipped].T, spins_old, np.empty(flipped.size, np.int64))
+
+    delta = d @ row_fields
+    delta += col_fields @ d
+    delta += d @ np.matmul(J[np.ix_(flipped, flipped)], d, dtype=np.int64)
+
+    return int(delta)
+
+
+def calculate_energy_difference_batch(sigma_old, sigmas_new, J):
+    """
+    Calculate Delta_H = H_new - H_old for a batch of candidate states
+    For integer J the candidates are evaluated in parallel (numba prange) with the
+    flipped-spin form; float J evaluates each candidate Hamiltonian, matching
+    calculate_energy_difference
+    
+    Args:
+        sigma_old: Old binary vector (numpy array, length N)
+        sigmas_new: Candidate binary vectors (numpy array, shape B x N)
+        J: Coupling matrix (numpy array, square matrix)
+    
+    Returns:
+        numpy int64 array of length B, entry b equal to
+        calculate_energy_difference(sigma_old, sigmas_new[b], J)
+    
+    Example:
+        >>> sigma_old = np.ones(256)
+        >>> sigmas_new = np.ones((256, 256)) - np.eye(256)  # every single flip
+        >>> deltas = calculate_energy_difference_batch(sigma_old, sigmas_new, J)
+    """
+    sigma_old = np.asarray(sigma_old)
+    sigmas_new = np.asarray(sigmas_new)
+    J = np.asarray(J)
+    
+    if sigmas_new.ndim != 2 or sigmas_new.shape[1] != sigma_old.shape[0]:
+        raise ValueError(
+            f"sigmas_new must have shape (B, {sigma_old.shape[0]}), got {sigmas_new.shape}"
+        )
+    
+    # Float J: Delta_H is defined on the int-truncated energies
+    if not _is_integer_j(J):
+        energy_old = calculate_hamiltonian(sigma_old, J)
+        energies_new = [calculate_hamiltonian(sigma_new, J) for sigma_new in sigmas_new]
+        return np.array(energies_new, dtype=np.int64) - energy_old
+    
+    spins_old = _spin_lut(sigma_old).astype(np.int64)
+    deltas = np.zeros(sigmas_new.shape[0], dtype=np.int64)
+    if sigma_old.shape[0]:
+        _energy_difference_batch(spins_old, sigma_old, sigmas_new, J, deltas)
+    
+    return deltas
+
+
+@njit(cache=_NUMBA_CACHE)
+def _energy_difference_one(spins_old, sigma_old, sigma_new, J):
+    """
+    Flipped-spin Delta_H of calculate_energy_difference for one candidate
+    """
+    size = spins_old.shape[0]
+    flipped = np.empty(size, dtype=np.int64)
+    k = 0
+    for i in range(size):
+        if sigma_old[i] != sigma_new[i]:
+            flipped[k] = i
+            k += 1
+    
+    delta = 0
+    for a in range(k):
+        i = flipped[a]
+        d_i = -2 * spins_old[i]
+        
+        # d^T J s + s^T J d: row i and column i of J against the old spins
+        field = 0
+        for j in range(size):
+            field += J[i, j] * spins_old[j] + J[j, i] * spins_old[j]
+        delta += d_i * field
+        
+        # d^T J d: couplings between flipped spins
+        for c in range(k):
+            j = flipped[c]
+            delta += d_i * J[i, j] * (-2 * spins_old[j])
     
-    return energy_new - energy_old
+    return delta
+
+
+@njit(cache=_NUMBA_CACHE, parallel=True)
+def _energy_difference_batch(spins_old, sigma_old, sigmas_new, J, deltas):
+    """
+    Fill deltas[b] with the energy difference of candidate b (J is shared read-only)
+    """
+    for b in prange(sigmas_new.shape[0]):
+        deltas[b] = _energy_difference_one(spins_old, sigma_old, sigmas_new[b], J)
 
 
 def generate_constant_j_matrix(size, const_val):
@@ -70,37 +295,92 @@ def generate_constant_j_matrix(size, const_val):
     return np.ones((size, size)) * const_val
 
 
-def generate_random_j_matrix(size, max_val):
+def generate_random_j_matrix(size, max_val, rng=None):
     """
     Generate a random J matrix with integer values
     
     Args:
         size: Matrix dimension (N x N)
         max_val: Maximum value (inclusive)
+        rng: Optional np.random.Generator or seed; draws come from the PCG64 Generator.
+             When omitted, the legacy global state is used, so np.random.seed() applies
+    
+    Returns:
+        int64 numpy array of shape (size, size) with random integers [0, max_val]
+    """
+    if rng is None:
+        return np.random.randint(0, max_val + 1, size=(size, size), dtype=np.int64)
+    
+    rng = np.random.default_rng(rng)
+    return rng.integers(0, max_val, size=(size, size), dtype=np.int64, endpoint=True)
+
+
+def pack_j(J):
+    """
+    Pack an integer-valued J matrix as a C-contiguous int16 array
+    The buffer starts on a 64-byte boundary so rows line up with cache lines / SIMD loads
+    The result is a copy: pass it to calculate_expected_output, and pack again after
+    changing J
+    
+    Args:
+        J: Coupling matrix (numpy array) with integer values in the int16 range
     
     Returns:
-        numpy array of shape (size, size) with random integers [0, max_val]
+        int16 numpy array with the same shape and values as J
+    
+    Raises:
+        ValueError: If J has non-integer values or values outside the int16 range
     """
-    return np.random.randint(0, max_val + 1, size=(size, size))
+    J = np.asarray(J)
+    info = np.iinfo(np.int16)
+    if J.size and (J.min() < info.min or J.max() > info.max):
+        raise ValueError(f"J values must lie in [{info.min}, {info.max}] to pack as int16")
+    if J.dtype.kind not in "iub" and not np.array_equal(J, np.round(J)):
+        raise ValueError("J must be integer-valued to pack as int16")
+    
+    # Over-allocate by one cache line and start the array on the first aligned byte
+    raw = np.empty(J.size * 2 + 64, dtype=np.uint8)
+    offset = -raw.ctypes.data % 64
+    J_packed = raw[offset:offset + J.size * 2].view(np.int16).reshape(J.shape)
+    J_packed[...] = J
+    return J_packed
 
 
-def verify_global_flip_symmetry(J):
+def symmetrize_j(J):
+    """
+    Symmetric part of J for calculate_hamiltonian(..., J_sym=...)
+    (J + J^T) / 2 has the same quadratic form as J, and SYMV only reads one triangle
+    Recompute it whenever J changes
+    
+    Args:
+        J: Coupling matrix (numpy array, square matrix)
+    
+    Returns:
+        Fortran-ordered float64 numpy array (J + J^T) / 2
+    """
+    J = np.asarray(J, dtype=np.float64)
+    return np.asfortranarray((J + J.T) * 0.5)
+
+
+def verify_global_flip_symmetry(J, verify=False):
     """
     Verify that flipping all spins leaves energy unchanged
     This should always be true for Ising models without bias
     
     Args:
         J: Coupling matrix
+        verify: If True, evaluate both Hamiltonians explicitly instead of
+                using the closed form 1^T J 1 = (-1)^T J (-1) = sum(J)
     
     Returns:
         True if symmetry holds, False otherwise
     """
-    size = J.shape[0]
-    sigma_all_ones = np.ones(size)
-    sigma_all_zeros = np.zeros(size)
-    
-    energy_ones = calculate_hamiltonian(sigma_all_ones, J)
-    energy_zeros = calculate_hamiltonian(sigma_all_zeros, J)
+    if verify:
+        size = J.shape[0]
+        energy_ones = calculate_hamiltonian(np.ones(size), J)
+        energy_zeros = calculate_hamiltonian(np.zeros(size), J)
+    else:
+        energy_ones = energy_zeros = int(J.sum())
     
     delta = energy_ones - energy_zeros
     
@@ -111,7 +391,7 @@ def verify_global_flip_symmetry(J):
     return delta == 0
 
 
-def generate_sigma_f(sigma_previous, sigma_new):
+def generate_sigma_f(sigma_previous, sigma_new, out=None):
     """
     Generate sigma_f and sigma_f_inv from sigma_previous and sigma_new
     sigma_f = XOR to find flipped bits
@@ -120,12 +400,19 @@ def generate_sigma_f(sigma_previous, sigma_new):
     Args:
         sigma_previous: Previous binary vector (numpy array)
         sigma_new: New binary vector (numpy array)
+        out: Optional (sigma_f, sigma_f_inv) pair of uint8 arrays to write into
     
     Returns:
-        Tuple of (sigma_f, sigma_f_inv)
+        Tuple of (sigma_f, sigma_f_inv) as uint8 arrays
     """
-    sigma_f = np.logical_xor(sigma_previous, sigma_new).astype(int)
-    sigma_f_inv = np.logical_not(sigma_f).astype(int)
+    if out is None:
+        size = np.shape(sigma_new)[0]
+        out = (np.empty(size, dtype=np.uint8), np.empty(size, dtype=np.uint8))
+    sigma_f, sigma_f_inv = out
+    
+    # XOR written straight into the uint8 result, NOT as 1 - sigma_f
+    np.logical_xor(sigma_previous, sigma_new, out=sigma_f)
+    np.subtract(1, sigma_f, out=sigma_f_inv)
     return sigma_f, sigma_f_inv
 
 
@@ -144,11 +431,9 @@ def generate_sigma_c(sigma_f, sigma_new, vector_size):
     """
     sigma_c = np.zeros(sigma_f.shape[0], dtype=int)
     
-    for i in range(vector_size):
-        if sigma_f[i]:
-            sigma_c[i] = 1 if sigma_new[i] else -1
-        else:
-            sigma_c[i] = 0
+    # Masked bits take the spin of sigma_new (+1/-1), the rest stay 0
+    spins_new = _spin_lut(sigma_new[:vector_size])
+    np.multiply(sigma_f[:vector_size] != 0, spins_new, out=sigma_c[:vector_size])
     
     return sigma_c
 
@@ -168,15 +453,56 @@ def generate_sigma_r(sigma_f_inv, sigma_new, vector_size):
     """
     sigma_r = np.zeros(sigma_f_inv.shape[0], dtype=int)
     
-    for i in range(vector_size):
-        if sigma_f_inv[i]:
-            sigma_r[i] = 1 if sigma_new[i] else -1
-        else:
-            sigma_r[i] = 0
+    # Masked bits take the spin of sigma_new (+1/-1), the rest stay 0
+    spins_new = _spin_lut(sigma_new[:vector_size])
+    np.multiply(sigma_f_inv[:vector_size] != 0, spins_new, out=sigma_r[:vector_size])
     
     return sigma_r
 
 
+# Cython build of the hardware model loop (hw_model.pyx), set by load_cython_model()
+_expected_output_packed = None
+
+
+def load_cython_model():
+    """
+    Compile hw_model.pyx (via pyximport, cached after the first build) and enable it
+    Afterwards calculate_expected_output runs packed int16 J (see pack_j) through
+    the Cython loop; until then, and if this fails, the numba kernel handles every J
+    
+    Returns:
+        True if the Cython loop is enabled, False if Cython or a C compiler is missing
+    """
+    global _expected_output_packed
+    if _expected_output_packed is None:
+        # Build from the file next to this module, so it works without this
+        # directory on sys.path (package import, runpy from elsewhere)
+        pyx_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hw_model.pyx")
+        try:
+            import pyximport
+            
+            importers = pyximport.install(language_level=3)
+            try:
+                # Same build directory pyximport.install() uses, outside the source tree
+                so_path = pyximport.build_module(
+                    "hw_model", pyx_path, language_level=3,
+                    pyxbuild_dir=os.path.join(os.path.expanduser("~"), ".pyxbld"),
+                )
+            finally:
+                pyximport.uninstall(*importers)
+        except Exception:
+            # Missing Cython raises ImportError, a failed C build a distutils error
+            return False
+        
+        spec = importlib.util.spec_from_file_location(
+            "hw_model", so_path, loader=ExtensionFileLoader("hw_model", so_path)
+        )
+        hw_model = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(hw_model)
+        _expected_output_packed = hw_model.expected_output_packed
+    return True
+
+
 def calculate_expected_output(sigma_r, sigma_c, J, col_per_cc, vector_size):
     """
     Calculate expected output from compute_unit (software model)
@@ -185,27 +511,76 @@ def calculate_expected_output(sigma_r, sigma_c, J, col_per_cc, vector_size):
     Args:
         sigma_r: Row encoding (numpy array): 0, +1, or -1
         sigma_c: Column encoding (numpy array): 0, +1, or -1
-        J: Coupling matrix (numpy array)
+        J: Coupling matrix (numpy array); pass pack_j(J) for the int16 fast path
         col_per_cc: Number of columns per cycle
         vector_size: Vector size (rows)
     
     Returns:
         Total energy sum
     """
-    total_sum = 0
+    J = np.asarray(J)
+    sigma_r = np.asarray(sigma_r)
+    sigma_c = np.asarray(sigma_c)
+    
+    # The compiled kernels do not bounds-check, so reject out-of-range sizes up front
+    if (col_per_cc > J.shape[0] or col_per_cc > sigma_c.shape[0]
+            or vector_size > J.shape[1] or vector_size > sigma_r.shape[0]):
+        raise IndexError("col_per_cc / vector_size exceed the sigma or J dimensions")
+    
+    # Packed int16 J goes through the Cython loop once load_cython_model() enabled it
+    if _expected_output_packed is not None and J.dtype == np.int16:
+        return int(_expected_output_packed(
+            np.ascontiguousarray(sigma_r, dtype=np.int64),
+            np.ascontiguousarray(sigma_c, dtype=np.int64),
+            np.ascontiguousarray(J), col_per_cc, vector_size,
+        ))
+    
+    # Accumulate in int64 for integer J (no overflow for narrow dtypes), float64 otherwise
+    # A non-positive column count sums nothing, as the plain loop did
+    partial = np.zeros(max(col_per_cc, 0), dtype=np.result_type(J.dtype, np.int64))
+    _expected_output_columns(sigma_r, sigma_c, J, col_per_cc, vector_size, partial)
+    
+    return int(partial.sum())
+
+
+# Tile edge for the hardware model loop: a 64-entry sigma_r tile and a 64 x 64
+# J tile stay resident in L1 while a block of columns is accumulated
+_TILE = 64
+
+
+@njit(cache=_NUMBA_CACHE, parallel=True, fastmath=True)
+def _expected_output_columns(sigma_r, sigma_c, J, col_per_cc, vector_size, partial):
+    """
+    Per-column contributions of calculate_expected_output, written into partial
+    Column blocks are independent, so each one writes its own slots (no reduction race)
+    """
+    n_col_blocks = (col_per_cc + _TILE - 1) // _TILE
     
-    # Process each column
-    for col in range(col_per_cc):
-        column_sum = 0
+    # Process columns block by block
+    for cb in prange(n_col_blocks):
+        c0 = cb * _TILE
+        c1 = min(c0 + _TILE, col_per_cc)
+        column_sum = np.zeros(c1 - c0, dtype=partial.dtype)
         
-        # Compute dot product for this column
-        for row in range(vector_size):
-            column_sum += sigma_r[row] * J[col, row]
+        # Compute dot products for this block of columns, one row tile at a time
+        for r0 in range(0, vector_size, _TILE):
+            r1 = min(r0 + _TILE, vector_size)
+            for col in range(c0, c1):
+                acc = 0
+                for row in range(r0, r1):
+                    acc += sigma_r[row] * J[col, row]
+                column_sum[col - c0] += acc
         
-        # Apply sigma_c sign selection
-        total_sum += sigma_c[col] * column_sum
-    
-    return int(total_sum)
+        # Apply sigma_c sign selection once the full column is accumulated
+        for col in range(c0, c1):
+            partial[col] = sigma_c[col] * column_sum[col - c0]
+
+
+# Compile the kernel for the default int sigma / float J signature at import,
+# so the first testbench call does not pay the JIT cost
+_expected_output_columns(
+    np.ones(1, dtype=int), np.ones(1, dtype=int), np.ones((1, 1)), 1, 1, np.zeros(1)
+)
 
 
 def energy_from_columns_full(sigma_bits, J, vector_size):
@@ -221,23 +596,20 @@ def energy_from_columns_full(sigma_bits, J, vector_size):
     Returns:
         Total energy
     """
-    total_energy = 0
+    # Sum over columns of sigma[col] * (J[col, :] . sigma) is the quadratic form
+    s = sigma_bits[:vector_size]
+    J_active = J[:vector_size, :vector_size]
     
-    # Process each column, all rows
-    for col in range(vector_size):
-        column_contribution = 0
-        sigma_c_val = sigma_bits[col]
-        
-        for row in range(vector_size):
-            sigma_r_val = sigma_bits[row]
-            column_contribution += sigma_r_val * J[col, row]
-        
-        total_energy += sigma_c_val * column_contribution
+    # Integer operands stay on int64 accumulation, so narrow dtypes cannot overflow
+    if _is_integer_j(J) and np.issubdtype(s.dtype, np.integer):
+        Js = _int_spin_matvec(J_active, s, np.empty(J_active.shape[0], np.int64))
+        return int(np.dot(s, Js))
     
-    return int(total_energy)
+    # Same (J @ s) . s order as calculate_hamiltonian, so float results truncate alike
+    return int(np.dot(s, J_active @ s))
 
 
-def verify_iterative_vs_hamiltonian(sigma_old, sigma_new, J, vector_size):
+def verify_iterative_vs_hamiltonian(sigma_old, sigma_new, J, vector_size, J_sym=None):
     """
     Verify iterative column processing matches full Hamiltonian energy difference
     
@@ -246,13 +618,14 @@ def verify_iterative_vs_hamiltonian(sigma_old, sigma_new, J, vector_size):
         sigma_new: New binary vector (numpy array)
         J: Coupling matrix (numpy array)
         vector_size: Active vector size
+        J_sym: Optional symmetrize_j(J), passed to calculate_energy_difference
     
     Returns:
         Tuple of (match, iterative_result, hamiltonian_result)
     """
     # Convert to spin encodings (+1 or -1)
-    spins_old = 2 * sigma_old - 1
-    spins_new = 2 * sigma_new - 1
+    spins_old = _spin_lut(sigma_old)
+    spins_new = _spin_lut(sigma_new)
     
     # Column-wise energies
     energy_new_cols = energy_from_columns_full(spins_new, J, vector_size)
@@ -260,7 +633,7 @@ def verify_iterative_vs_hamiltonian(sigma_old, sigma_new, J, vector_size):
     iterative_result = energy_new_cols - energy_old_cols
     
     # Full Hamiltonian energy difference
-    hamiltonian_result = calculate_energy_difference(sigma_old, sigma_new, J)
+    hamiltonian_result = calculate_energy_difference(sigma_old, sigma_new, J, J_sym)
     
     match = (iterative_result == hamiltonian_result)
     
@@ -372,3 +745,18 @@ if __name__ == "__main__":
     print(f"Hardware model output: {hw_output}")
     print(f"Actual energy delta:   {delta_actual}")
     print(f"Note: Hardware output processes only flipped columns\n")
+    
+    # Test 8: Batched energy differences vs one-by-one evaluation
+    print("=== TEST 8: Batched energy differences ===")
+    J_rand = generate_random_j_matrix(N, 7, rng=0)
+    sigma_old = np.ones(N, dtype=int)
+    
+    # Every single-spin flip, plus the global flip
+    sigmas_new = np.vstack([1 - np.eye(N, dtype=int), np.zeros((1, N), dtype=int)])
+    
+    batch = calculate_energy_difference_batch(sigma_old, sigmas_new, J_rand)
+    single = [calculate_energy_difference(sigma_old, s, J_rand) for s in sigmas_new]
+    
+    print(f"Candidates: {len(sigmas_new)}")
+    print(f"Global flip delta (expected 0): {batch[-1]}")
+    print(f"Match: {np.array_equal(batch, single)}\n")
@@ -0,0 +1,57 @@
+# cython: language_level=3
+"""
+Cython build of the compute_unit hardware model loop
+Same computation as calculate_expected_output in high_level_hamiltonian.py,
+specialised for int64 sigma encodings and a packed int16 J (see pack_j)
+"""
+
+cimport cython
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef long long _expected_output(const long long[::1] sigma_r, const long long[::1] sigma_c,
+                                const short[:, ::1] J, Py_ssize_t col_per_cc,
+                                Py_ssize_t vector_size) noexcept nogil:
+    cdef long long total_sum = 0
+    cdef long long column_sum
+    cdef Py_ssize_t col, row
+
+    # Process each column
+    for col in range(col_per_cc):
+        column_sum = 0
+
+        # Compute dot product for this column
+        for row in range(vector_size):
+            column_sum += sigma_r[row] * J[col, row]
+
+        # Apply sigma_c sign selection
+        total_sum += sigma_c[col] * column_sum
+
+    return total_sum
+
+
+def expected_output_packed(const long long[::1] sigma_r, const long long[::1] sigma_c,
+                           const short[:, ::1] J, Py_ssize_t col_per_cc,
+                           Py_ssize_t vector_size):
+    """
+    Calculate expected output from compute_unit for a packed int16 J
+
+    Args:
+        sigma_r: Row encoding (contiguous int64 array): 0, +1, or -1
+        sigma_c: Column encoding (contiguous int64 array): 0, +1, or -1
+        J: Coupling matrix (C-contiguous int16 array)
+        col_per_cc: Number of columns per cycle
+        vector_size: Vector size (rows)
+
+    Returns:
+        Total energy sum
+    """
+    if (col_per_cc > J.shape[0] or col_per_cc > sigma_c.shape[0]
+            or vector_size > J.shape[1] or vector_size > sigma_r.shape[0]):
+        raise IndexError("col_per_cc / vector_size exceed the sigma or J dimensions")
+
+    cdef long long total_sum
+    with nogil:
+        total_sum = _expected_output(sigma_r, sigma_c, J, col_per_cc, vector_size)
+    return total_sum